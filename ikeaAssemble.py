@@ -29,61 +29,110 @@ INSTRUCTION_CODES = {
     "RETURN": "0000000010000000000001000000000000000010"
 }
 
+# Same instruction codes, but parsed into integers once and already shifted into the top 40 bits of a 64 bit instruction
+# This way, fetching an opcode gives us the instruction with its params zeroed out, and we just OR the params in
+OPCODE_WORD = {command: int(code, 2) << 24 for command, code in INSTRUCTION_CODES.items()}
+
 # Seperates instructions in 7 categories. Some of them are redundant (not too optimized)
 # but human readability > optimization (software engineering mindset lmao) so we're splitting it into 7
 
 # Category 1 follows WR, RR1, RR2
-CAT1 = [
+CAT1 = frozenset([
     "ADD", "ADD_SETFLAG", "SUB", "SUB_SETFLAG", "AND", "OR"
-]
+])
 
 # Category 2 follows WR, RR1, offset (8 bit imm)
-CAT2 = [
+CAT2 = frozenset([
     "LOAD"
-]
+])
 
 # Category 3 follows WR, label
-CAT3 = [
+CAT3 = frozenset([
     "ADDRESS"
-]
+])
 
 # Category 4 follows RR2, RR1, offset (8 bit imm)
-CAT4 = [
+CAT4 = frozenset([
     "STORE"
-]
+])
 
 # Category 5 follows WR, RR2
-CAT5 = [
+CAT5 = frozenset([
     "SET"
-]
+])
 
 # Category 6 follows WR, 8 bit imm
-CAT6 = [
+CAT6 = frozenset([
     "SETIMM"
-]
+])
 
 # Category 7 follows [label]
-CAT7 = [
+CAT7 = frozenset([
     "BRANCH",
-]
+])
 
 # Category 8 follows RR1, label
-CAT8 = [
+CAT8 = frozenset([
     "BRANCH_IF_ZERO",
     "BRANCH_IF_NOT_ZERO"
-]
+])
 
 # Category 9 is just RETURN
-CAT9 = [
+CAT9 = frozenset([
     "RETURN"
-]
+])
 
 # Category 10 is BRANCH_LINK, which has [label]
-CAT10 = [
+CAT10 = frozenset([
     "BRANCH_LINK"
-]
+])
+
+# Lookup table of command --> category number, so generate_binary only needs one dict lookup instead of scanning every category
+CATEGORY = {
+    command: category_num
+    for category_num, category in enumerate([CAT1, CAT2, CAT3, CAT4, CAT5, CAT6, CAT7, CAT8, CAT9, CAT10], 1)
+    for command in category
+}
+
+# RAM and ROM are both 256 bytes. LOGISIM image files print them out in rows of 16 bytes
+MEMORY_SIZE = 256
+ROW_SIZE = 16
+OUT_OF_MEMORY_MESSAGE = "Too many instructions or data being declared. IKEA only handles up to 256 bytes of data."
+
+# Precomputed lookup tables. Indexing a tuple is way cheaper than calling format() on every operand we emit
+HEX2 = tuple(f"{i:02x}" for i in range(256))           # 1 byte -> 2 hexadecimals
+BIN8 = tuple(f"{i:08b}" for i in range(256))           # 1 byte -> 8 bit binary
+HEX_DIGITS = "0123456789abcdef"                         # 1 nibble -> 1 hexadecimal
+
+# Translation table that deletes the X in front of registers (ie. X30 --> 30)
+# If operands ever pick up other decorations, add them here and every converter picks it up through _parse_number
+_STRIP_X = str.maketrans("", "", "X")
+
+# Precompiled regexes so we don't go through re's compile cache on every line
+_CLEAN_RE = re.compile(r"#.*$|(?<=[,:])\s+")     # Comments, and whitespace after commas and colons
+_LABEL_RE = re.compile(r"^\w+:")                 # A label in front of an instruction (ie. _amogus:ADD X5,X3,X2)
+_LABEL_ONLY_RE = re.compile(r"^\w+:$")           # A label sitting on its own line
 
 # ---------------------- HELPER FUNCTIONS ------------------------------
+def _parse_number(item:str) -> int:
+    '''
+    Parses an operand into a number. If something contains an X (prolly from a register), remove it
+    All the convert_* helpers go through this, so they strip operands the exact same way
+    @param item Thing to parse. This MUST be an actual number (once the X is gone)
+    @returns The number in item
+    '''
+    return int(item.translate(_STRIP_X))
+
+def _to_i8(item:str) -> int:
+    '''
+    Converts a given item into a signed 8 bit integer (the raw byte, so it's 0-255)
+    If something contains an X (prolly from a register), remove it
+    @param item Thing to convert. This MUST be an actual number
+    @returns The byte representing item
+    '''
+    # Masking with 0xff gives us twos complement for free. -1 is really MAX_NUM - 1 in signed
+    return _parse_number(item) & 0xff
+
 def convert_8_bit_bin(item:str) -> str:
     '''
     Converts a given item into signed 8 bit binary
@@ -91,12 +140,7 @@ def convert_8_bit_bin(item:str) -> str:
     @param item Thing to convert. This MUST be an actual number
     @returns Binary form of item
     '''
-    num_2_parse = int(item.replace("X", ""))
-
-    if num_2_parse < 0:                 # Use twos complement. -1 is really MAX_NUM - 1 in signed
-        num_2_parse += 2 ** 8
-    
-    return format(num_2_parse,'08b')
+    return BIN8[_to_i8(item)]
 
 def convert_nibble_hex(item:str) -> str:
     '''
@@ -104,9 +148,9 @@ def convert_nibble_hex(item:str) -> str:
     @param item Thing to convert. This MUST be an actual number
     @returns Hexadecimal form of item
     '''
-    num_2_parse = int(item.replace("X", ""))
+    num_2_parse = _parse_number(item)
     assert num_2_parse < 16 and num_2_parse >= 0, "The number must be a positive integer that can fit within 4 bytes"
-    return format(num_2_parse,'x')
+    return HEX_DIGITS[num_2_parse]
 
 def convert_8_byte_hex(item:str) -> str:
     '''
@@ -115,12 +159,8 @@ def convert_8_byte_hex(item:str) -> str:
     @param item Thing to convert. This MUST be a parsable number
     @returns Hexadecimal form of item
     '''
-    num_2_parse = int(item.replace("X", ""))
-
-    if num_2_parse < 0:                 # Use twos complement. -1 is really MAX_NUM - 1 in signed
-        num_2_parse += 2 ** 64
-
-    return format(num_2_parse,'016x')
+    # Masking with 64 ones gives us twos complement. -1 is really MAX_NUM - 1 in signed
+    return format(_parse_number(item) & ((1 << 64) - 1), '016x')
 
 def convert_1_byte_hex(item:str) -> str:
     '''
@@ -128,20 +168,19 @@ def convert_1_byte_hex(item:str) -> str:
     @param item Thing to convert. This MUST be an actual number
     @returns Hexadecimal form of item
     '''
-    num_2_parse = int(item.replace("X", ""))
-
-    if num_2_parse < 0:                 # Use twos complement. -1 is really MAX_NUM - 1 in signed
-        num_2_parse += 2 ** 8
-    
-    return format(num_2_parse,'02x')
+    return HEX2[_to_i8(item)]
 
-def convert_8_byte_hex(binary:str) -> str:
+def encode_instruction(opcode_word:int, byte2:int, byte1:int, byte0:int) -> int:
     '''
-    Convert a 8 byte binary into hexadecimal
-    @param binary The binary to convert
-    @returns Hexadecimal
+    Packs an opcode and its 3 parameter bytes into a 64 bit instruction
+    The opcode takes up the top 40 bits, and the parameter bytes fill the bottom 24 bits (byte2 being the most significant)
+    @param opcode_word The opcode, already shifted into the top 40 bits (see OPCODE_WORD)
+    @param byte2 Parameter byte for bits 16-23
+    @param byte1 Parameter byte for bits 8-15
+    @param byte0 Parameter byte for bits 0-7
+    @returns The instruction as an integer
     '''
-    return format(int(binary, 2), '016x')
+    return opcode_word | (byte2 << 16) | (byte1 << 8) | byte0
 
 def check_file_syntax(fileArr: list[str]):
     '''
@@ -154,69 +193,30 @@ def check_file_syntax(fileArr: list[str]):
 class RAMROM_dict:
     def __init__(self):
         '''
-        Generates a 256 byte representation of RAM and ROM memory in dictionary form
+        Generates a 256 byte representation of RAM and ROM memory
         This class resembles an image file that we will write to.
         '''
 
         '''
-        The image file, represented as a dictionary.
-        The keys in the dict are placed at 16 bit intervals (represented in hex) and values being array of len 16
-        It's structured this way as LOGISIM image files are structured in a similar fashion
+        The image file, represented as one flat 256 byte buffer. Index i is memory address i.
+        LOGISIM image files group these into rows of 16, but we only care about that when we write the file out
         '''
-        self.image_file = {
-            "00": ["00"] * 16,
-            "10": ["00"] * 16,              # These look like increments of 10, but they're in hex so they're actually increments of 16
-            "20": ["00"] * 16,
-            "30": ["00"] * 16,
-            "40": ["00"] * 16,
-            "50": ["00"] * 16,
-            "60": ["00"] * 16,
-            "70": ["00"] * 16,
-            "80": ["00"] * 16,
-            "90": ["00"] * 16,
-            "a0": ["00"] * 16,
-            "b0": ["00"] * 16,
-            "c0": ["00"] * 16,
-            "d0": ["00"] * 16,
-            "e0": ["00"] * 16,
-            "f0": ["00"] * 16
-        }
-        
-        # This is more of a helper variable that simplifies implementation down the line. It's a bit excessive to declare another one here,
-        # but I value readability > optimization in my code so here we go
-        self.keys = list(self.image_file.keys())
+        self.mem = bytearray(MEMORY_SIZE)
 
-        '''
-        Pointer to the current location inside the image file that we should write to
-        The first item in that tuple represents the key to write to. The second item represents the index to write to
-        '''
-        self.current_loc = ("00", 0)
+        # Pointer to the current location (memory address) inside the image file that we should write to
+        self.cursor = 0
 
     def __update_current_loc(self, byte_size:int=8):
         '''
         Updates the current location tracker for the RAM/ROM dict by $byte_size. By default, this is 8 bytes.
         @precondition byte_size is a power of 2 (2 ** 0 to 2 ** 4)
         @param byte_size The byte size to update current location pointer by
-        @raises MemoryError Due to RAM/ROM's memory limit, the compiler will throw a memory exception if you try to update current location when you're at ("f0", 16 - $byte_size)
+        @raises MemoryError Due to RAM/ROM's memory limit, the compiler will throw a memory exception if updating the current location would move it past the last byte
         '''
-        # Constant that represents the last idx you can store something in a row before having to move on to the next index
-        MAX_BYTE_IN_ROW = 16 - byte_size    
-
-        if self.current_loc == ("f0", 16 - byte_size):
-            raise MemoryError("Too many instructions or data being declared. IKEA only handles up to 256 bytes of data.")
-
-        current_key, current_idx = self.current_loc
+        self.cursor += byte_size
 
-        if current_idx != MAX_BYTE_IN_ROW:
-            current_idx += byte_size                 # If current index is not at max_byte yet, we add $byte_size to get the next location (since memory files are in increments of 16)
-        else:
-            # Otherwise, set the current index to 0 and move the current key to the next key
-            current_idx = 0
-
-            # This will never go out of bounds -- ("f0", 16 - $byte_size) throws a MemoryError and is already caught
-            current_key = self.keys[self.keys.index(current_key) + 1]
-
-        self.current_loc = (current_key, current_idx)
+        if self.cursor > MEMORY_SIZE:
+            raise MemoryError(OUT_OF_MEMORY_MESSAGE)
 
     def write_bytes(self, to_write:str, byte_size:int=8) -> str:
         '''
@@ -225,23 +225,35 @@ class RAMROM_dict:
         @param to_write The string of data (in hexadecimal form) to write
         @param byte_size Number of bytes to write
         @returns A string representing the address the current item is in (in 8 bit binary)
+        @raises ValueError If to_write isn't exactly $byte_size bytes of hexadecimals (only checked when Python isn't run with -O)
         '''
         HEX_IN_BYTE = 2
-        assert len(to_write) == byte_size * HEX_IN_BYTE, f"to_write is not {byte_size} bytes (needs {byte_size * HEX_IN_BYTE} hexadecimals)"
 
-        current_key, current_idx = self.current_loc
+        # Only checked in debug mode (like an assert), and the error message only gets built if the check actually fails
+        if __debug__ and len(to_write) != byte_size * HEX_IN_BYTE:
+            raise ValueError(f"to_write is not {byte_size} bytes (needs {byte_size * HEX_IN_BYTE} hexadecimals)")
 
-        # byte_size - 1 because indexing is dumb
-        # The second argument in range is -1 because we want to take into account 0
-        for i in range(byte_size - 1, -1, -1):
-            self.image_file[current_key][current_idx + (byte_size - 1 - i)] = to_write[HEX_IN_BYTE * i : HEX_IN_BYTE * i + HEX_IN_BYTE]
+        return self.write_word(int(to_write, 16), byte_size)
 
-        memory_address = f"{current_key[0]}{convert_nibble_hex(str(current_idx))}"
+    def write_word(self, word:int, byte_size:int=8) -> str:
+        '''
+        Writes $word as a $byte_size byte integer to the RAM/ROM dict. By default, this writes 8 bytes
+        LSB goes to lower addresses (and vice versa for MSB)
+        @precondition word fits in $byte_size bytes (non-negative; do twos complement beforehand)
+        @param word The data to write
+        @param byte_size Number of bytes to write
+        @returns A string representing the address the current item is in (in 8 bit binary)
+        '''
+        memory_address = self.cursor
 
+        # Move the pointer first - this throws before we write anything out of bounds
         self.__update_current_loc(byte_size)
 
-        # Returns the address as a binary. It is currently in hex
-        return format(int(memory_address, 16), '08b')
+        # Little endian puts the LSB in the lower address
+        self.mem[memory_address : memory_address + byte_size] = word.to_bytes(byte_size, "little")
+
+        # Returns the address as a binary
+        return BIN8[memory_address]
     
     def calculate_offset(self, other_memory_addr:str) -> str:
         '''
@@ -251,16 +263,12 @@ class RAMROM_dict:
         @returns A signed 8-bit binary representing the offset
         '''
 
-        # First, let's get the current memory address
-        current_key, current_idx = self.current_loc
-        memory_address_hex = f"{current_key[0]}{convert_nibble_hex(str(current_idx))}"
-        
-        # Now, let's find the difference between other memory address (base 2) and the current mem hex (base 16)
-        # We take the modulus of 2^8 to get rid of any overflow (because we don't want to deal with them)
-        diff = (int(other_memory_addr, 2) - int(memory_address_hex, 16)) % (2 ** 8)
+        # Find the difference between other memory address (base 2) and the current memory address
+        # Masking with 0xff gets rid of any overflow (because we don't want to deal with them) and gives us twos complement for negative offsets
+        diff = (int(other_memory_addr, 2) - self.cursor) & 0xff
 
         # Return the difference as an 8 bit binary
-        return format(diff, "08b")
+        return BIN8[diff]
 
     def mem_addr_preview(self, instruction_num:int) -> str:
         '''
@@ -270,47 +278,22 @@ class RAMROM_dict:
         @returns A string representing the potential ROM address, as an 8 bit binary
         '''
         instruction_idx = instruction_num * 8
-        return convert_8_bit_bin(str(instruction_idx))
+        return BIN8[instruction_idx & 0xff]
     
     def generate_image_file(self, file_path:str):
         '''
         Generates an image file for the IKEA Assemble
         @param file_path The file path to write file to
         '''
-        to_write = "v3.0 hex words addressed\n"
-
-        for key, value in self.image_file.items():
-            to_write += f"{key}:"
+        # Build the file up line by line and join it once at the end, rather than copying an ever-growing string with +=
+        lines = ["v3.0 hex words addressed"]
 
-            for hexadecimal in value:
-                to_write += f" {hexadecimal}"
-
-            to_write += "\n"
+        # bytearray.hex() formats the whole row in C, putting a space between every byte
+        for row in range(0, MEMORY_SIZE, ROW_SIZE):
+            lines.append(f"{row:02x}: {self.mem[row : row + ROW_SIZE].hex(' ', 1)}")
                 
         with open(file_path, "w") as write_file:
-            write_file.write(to_write)
-
-def generate_label_lookup(instructions:list[str], rom_dict:RAMROM_dict) -> dict:
-    '''
-    IKEA Assembly language preprocessing before we convert
-    We will first scan the IKEA file for any labels and try to approximately predict their memory locations
-    @param instructions A list of instructions
-    @param rom_dict The ROM dictionary "image file" to represent how the instructions will be stored later
-    @returns A dictionary<label, predicted memory address in 8 bit binary)
-    '''
-    label_lookup = dict()
-    label_regexp = re.compile(r"^\w+:")
-
-    for i in range(len(instructions)):
-        current_instruction = instructions[i]
-        re_search_result = label_regexp.search(current_instruction)
-
-        # If there is a match, add its predicted memory slot to the dictionary
-        if re_search_result:
-            label_name = re_search_result.group().replace(":", "")      # We don't want colons in our label lookup
-            label_lookup[label_name] = rom_dict.mem_addr_preview(i)
-    
-    return label_lookup
+            write_file.write("\n".join(lines) + "\n")
 
 # ---------------------- MAIN PROCESSING FUNCTIONS ----------------------------
 def generate_image_files(fileArr:list[str], ram_file_path:str, rom_file_path:str):
@@ -320,8 +303,12 @@ def generate_image_files(fileArr:list[str], ram_file_path:str, rom_file_path:str
     @param ram_file_path Path to create a image file for memory data
     @param rom_file_path Path to create a image file for instruction binaries
     '''
-    instructions = fileArr[fileArr.index(".text") + 1: fileArr.index(".data")]
-    memory_data = fileArr[fileArr.index(".data") + 1:]
+    # Find each segment marker once. .data comes after .text, so we only need to search from there
+    text_idx = fileArr.index(".text")
+    data_idx = fileArr.index(".data", text_idx + 1)
+
+    instructions = fileArr[text_idx + 1 : data_idx]
+    memory_data = fileArr[data_idx + 1:]
 
     # Step 1) Generate RAM/ROM
 
@@ -338,8 +325,14 @@ def generate_image_files(fileArr:list[str], ram_file_path:str, rom_file_path:str
 
     # Step 3) Take care of instructions
 
-    label_lookup = generate_label_lookup(instructions, rom)
-    for instruction in instructions:
+    # Pull the labels off the instructions once, so neither the lookup nor the binary generation has to regex them again
+    parsed_instructions = split_labels(instructions)
+
+    # Every instruction is 8 bytes, so we already know where each label will end up in ROM before we generate any binary
+    # This gives us a dictionary<label, predicted memory address in 8 bit binary>
+    label_lookup = {label: rom.mem_addr_preview(i) for i, (label, instruction) in enumerate(parsed_instructions) if label is not None}
+
+    for label, instruction in parsed_instructions:
         generate_binary(rom, label_lookup, memory_lookup, instruction)
 
     # Step 4) Generate the two image files
@@ -357,10 +350,10 @@ def generate_memory(memory_dict:RAMROM_dict, memory_lookup:dict, current_mem_ins
     idx_colon = current_mem_instruction.index(":")
     label = current_mem_instruction[0:idx_colon]
     storage = current_mem_instruction[idx_colon + 1:]
-    storage_hex = convert_1_byte_hex(storage)
+    storage_byte = _to_i8(storage)
 
     # First, we alter the memory dictionary. The write function also returns the memory address
-    mem_addr = memory_dict.write_bytes(storage_hex, 1)
+    mem_addr = memory_dict.write_word(storage_byte, 1)
 
     # Then, we update the lookup table (RAM)
     memory_lookup[label] = mem_addr
@@ -369,6 +362,7 @@ def generate_binary(instruction_dict:RAMROM_dict, label_lookup:dict, memory_look
     '''
     Given a string containing IKEA instructions, convert that to binary
     This will write to the instruction dictionary (ROM)
+    @precondition instruction has already had its label removed (see split_labels)
     @precondition label_lookup is filled
     @precondition memory_lookup is filled
     @param instruction_dict The "image file" to write binary instructions to
@@ -376,49 +370,58 @@ def generate_binary(instruction_dict:RAMROM_dict, label_lookup:dict, memory_look
     @param memory_lookup Dictionary of memory tags (and their addresses)
     @param instruction The instruction to convert
     '''
-    EIGHT_ZEROES = "00000000"                   # Constant for a byte full of zeroes
+    LINK_REGISTER = _to_i8("X30")               # BRANCH_LINK and RETURN always use X30 to hold the return address
 
     space_idx = instruction.index(" ")          # The index of the space in instructions
     command = instruction[0:space_idx]          # The physical command we want to execute
-    command = re.sub(r"^\w+:", "", command)    # We have no more uses for labels at this stage since they've already been preprocessed in the lookup table. Remove them.
 
     # Instruction params are split by semicolons. This is why it was important earlier to get rid of whitespace after ","
     instruction_params = instruction[space_idx + 1:].split(",")
 
-    # If possible, convert the parameters to binary so machine code can use them. We'll take care of edge cases later
+    # If possible, convert the parameters to bytes so machine code can use them. We'll take care of edge cases later
     for i in range(len(instruction_params)):    
         try:
-            instruction_params[i] = convert_8_bit_bin(instruction_params[i])
+            instruction_params[i] = _to_i8(instruction_params[i])
         except:
             continue
 
-    opcode = INSTRUCTION_CODES[command]
-    binary_instruction = ""
-
-    if command in CAT1 or command in CAT2:
-        binary_instruction = f"{opcode}{instruction_params[2]}{instruction_params[1]}{instruction_params[0]}"
-    elif command in CAT3:
-        binary_instruction = f"{opcode}{memory_lookup[instruction_params[1]]}{EIGHT_ZEROES}{instruction_params[0]}"
-    elif command in CAT4:
-        binary_instruction = f"{opcode}{instruction_params[2]}{instruction_params[1]}{instruction_params[0]}"
-    elif command in CAT5 or command in CAT6:
-        binary_instruction = f"{opcode}{instruction_params[1]}{EIGHT_ZEROES}{instruction_params[0]}"
-    elif command in CAT7:
-        offset = instruction_dict.calculate_offset(label_lookup[instruction_params[0]])
-        binary_instruction = f"{opcode}{offset}{EIGHT_ZEROES}{EIGHT_ZEROES}"
-    elif command in CAT8:
-        offset = instruction_dict.calculate_offset(label_lookup[instruction_params[1]])
-        binary_instruction = f"{opcode}{offset}{instruction_params[0]}{EIGHT_ZEROES}"
-    elif command in CAT9:
-        binary_instruction = f"{opcode}{convert_8_bit_bin('X30')}{EIGHT_ZEROES}{EIGHT_ZEROES}"
-    elif command in CAT10:
-        offset = instruction_dict.calculate_offset(label_lookup[instruction_params[0]])
-        binary_instruction = f"{opcode}{offset}{EIGHT_ZEROES}{convert_8_bit_bin('X30')}"
-
-    #print(binary_instruction)
-    instruction_dict.write_bytes(convert_8_byte_hex(binary_instruction))
+    # Figure out which byte each param goes in. Any byte we don't set stays zeroed out
+    category = CATEGORY[command]
+    byte2, byte1, byte0 = 0, 0, 0
+
+    if category == 1 or category == 2:
+        byte2, byte1, byte0 = instruction_params[2], instruction_params[1], instruction_params[0]
+    elif category == 3:
+        byte2, byte0 = int(memory_lookup[instruction_params[1]], 2), instruction_params[0]
+    elif category == 4:
+        byte2, byte1, byte0 = instruction_params[2], instruction_params[1], instruction_params[0]
+    elif category == 5 or category == 6:
+        byte2, byte0 = instruction_params[1], instruction_params[0]
+    elif category == 7:
+        byte2 = int(instruction_dict.calculate_offset(label_lookup[instruction_params[0]]), 2)
+    elif category == 8:
+        byte2, byte1 = int(instruction_dict.calculate_offset(label_lookup[instruction_params[1]]), 2), instruction_params[0]
+    elif category == 9:
+        byte2 = LINK_REGISTER
+    elif category == 10:
+        byte2, byte0 = int(instruction_dict.calculate_offset(label_lookup[instruction_params[0]]), 2), LINK_REGISTER
+
+    binary_instruction = encode_instruction(OPCODE_WORD[command], byte2, byte1, byte0)
+
+    # The instruction stays an integer all the way into ROM - it only becomes a string when we generate the image file
+    #print(format(binary_instruction, '064b'))
+    instruction_dict.write_word(binary_instruction)
 
 # ------------------------- PARSE INPUTS --------------------------
+def clean_line(line:str) -> str:
+    '''
+    Cleans up a raw line from a .ikea file.
+    Gets rid of everything after '#', all whitespace after commas and colons, and any leading/trailing whitespace
+    @param line The raw line
+    @returns The cleaned line. This is an empty string if the line was blank (or just a comment)
+    '''
+    return _CLEAN_RE.sub("", line).strip()
+
 def merge_labels(instructions:list[str]) -> list[str]:
     '''
     Creates a new array of instructions where labels are merged with subsequent instructions.
@@ -427,26 +430,46 @@ def merge_labels(instructions:list[str]) -> list[str]:
     @returns A list of new instructions
     '''
     new_instructions = []
-    
-    # Tracker variable to track whether the last index had a label
-    last_idx_label = False
-
-    # Loop through old instructions
-    for i in range(len(instructions)):
-        if last_idx_label:
-            # If the last idx was a label, merge it
-            new_instructions.append(f"{instructions[i - 1]}{instructions[i]}")
-            last_idx_label = False
-        elif re.search(r"^\w+:$", instructions[i]):
-            # If the current idx is a label, update the instructions and continue
-            last_idx_label = True
-            continue
-        else:
-            # Otherwise, chuck as normal
-            new_instructions.append(instructions[i])
+
+    # We use an iterator so that when we hit a label, we can pull the next instruction straight off of it
+    instruction_iter = iter(instructions)
+
+    for instruction in instruction_iter:
+        if _LABEL_ONLY_RE.match(instruction):
+            # If the current idx is a label, merge it with the next instruction
+            next_instruction = next(instruction_iter, None)
+
+            # A label at the very end has nothing to merge with, so it gets dropped
+            if next_instruction is None:
+                break
+
+            instruction += next_instruction
+
+        new_instructions.append(instruction)
 
     return new_instructions
 
+def split_labels(instructions:list[str]) -> list[tuple]:
+    '''
+    Splits merged labels off of their instructions, so later passes don't have to regex for them again.
+    For instance, ["_amogus:ADD X5,X3,X2", "SUB X4,X3,X2"] --> [("_amogus", "ADD X5,X3,X2"), (None, "SUB X4,X3,X2")]
+    @precondition instructions have already gone through merge_labels
+    @param instructions Merged instructions
+    @returns A list of (label, instruction) tuples. The label is None if the instruction doesn't have one
+    '''
+    parsed_instructions = []
+
+    for instruction in instructions:
+        re_match_result = _LABEL_RE.match(instruction)
+
+        if re_match_result:
+            # We don't want colons in our label
+            parsed_instructions.append((re_match_result.group()[:-1], instruction[re_match_result.end():]))
+        else:
+            parsed_instructions.append((None, instruction))
+
+    return parsed_instructions
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Assembles a IKEA file and generates binary codes according to specifications. The file must end in .ikea", 
@@ -467,19 +490,9 @@ if __name__ == "__main__":
     
     with open(flags["file"], "r") as ikea_file:
         # Read and parse the file (and clean it)
-        ikea_instructions = ikea_file.read()
-        ikea_instructions = ikea_instructions.split("\n")
-
-        # Get rid of everything after '#'
-        ikea_instructions = list(map(lambda line: re.sub(r"#.*$", "", line), ikea_instructions))
-        ikea_instructions = list(map(lambda line: line.strip(), ikea_instructions))
-
-        # Get rid of all whitespace after commas and colons
-        ikea_instructions = list(map(lambda line: re.sub(r",\s*", ",", line), ikea_instructions))
-        ikea_instructions = list(map(lambda line: re.sub(r":\s*", ":", line), ikea_instructions))
-        
-        # Filter blank rows
-        ikea_instructions = list(filter(lambda line: line != "", ikea_instructions))
+        # Each line is cleaned and blank rows are filtered in the same pass, so we only build one list
+        cleaned_lines = (clean_line(line) for line in ikea_file.read().split("\n"))
+        ikea_instructions = [line for line in cleaned_lines if line != ""]
 
         # Clean the labels - if a previous index contains a label, merge it with the subsequent index
         ikea_instructions = merge_labels(ikea_instructions)